@@ -20,7 +20,7 @@ def get_device() -> torch.device:
 # Transforms
 preprocess = T.Compose(
     [
-        T.Resize((256 + 50, 256 + 50), antialias=True),
+        T.Resize(256, antialias=True),
         T.CenterCrop(256),
         T.ToTensor(),
         T.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5)),
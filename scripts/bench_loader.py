@@ -0,0 +1,97 @@
+"""Measure training dataloader throughput for several worker counts.
+
+More workers is not always faster: past a point the extra processes contend
+for the shared-memory queues. Use the printed numbers to pick
+--num_workers_train and --prefetch_factor for train.py. With
+--data_backend dali the sweep is over DALI's CPU thread count instead.
+The nvjpeg backend always decodes in the main process, so it has no
+worker count to sweep.
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import torchvision.transforms as T
+
+from aging_gan.data import UTKFace, make_transforms, make_unpaired_loader
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse command-line arguments for the loader benchmark."""
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument(
+        "--data_dir",
+        type=str,
+        default=str(Path(__file__).resolve().parents[1] / "data"),
+        help="Directory containing utkface_aligned_cropped/UTKFace.",
+    )
+    p.add_argument(
+        "--workers",
+        type=int,
+        nargs="+",
+        default=[1, 2, 4, 6, 8],
+        help="Worker counts (DALI: CPU thread counts) to benchmark.",
+    )
+    p.add_argument(
+        "--num_batches",
+        type=int,
+        default=200,
+        help="Batches to time per worker count (after one warm-up batch).",
+    )
+    p.add_argument("--train_batch_size", type=int, default=16)
+    p.add_argument("--img_size", type=int, default=256)
+    p.add_argument("--prefetch_factor", type=int, default=2)
+    p.add_argument("--data_backend", type=str, choices=["pil", "dali"], default="pil")
+    cfg = p.parse_args(argv)
+    if cfg.data_backend == "dali" and min(cfg.workers) < 1:
+        p.error("--workers must be >= 1 with --data_backend dali (DALI threads)")
+    if min(cfg.workers) < 0:
+        p.error("--workers must be >= 0")
+    return cfg
+
+
+def make_train_loader(cfg, full_ds: UTKFace, num_workers: int):
+    """Build only the training loader of ``cfg.data_backend``."""
+    if cfg.data_backend == "dali":
+        # imported lazily so DALI stays an optional dependency
+        from aging_gan.dali_pipeline import make_dali_unpaired_loader
+
+        return make_dali_unpaired_loader(
+            full_ds, "train", cfg.train_batch_size, cfg.img_size, num_workers
+        )
+    to_tensor = [] if full_ds.packed else [T.PILToTensor()]
+    train_transform, _ = make_transforms(cfg.img_size, to_tensor)
+    return make_unpaired_loader(
+        full_ds,
+        "train",
+        train_transform,
+        cfg.train_batch_size,
+        num_workers,
+        prefetch_factor=cfg.prefetch_factor,
+    )
+
+
+def main(argv: list[str] | None = None) -> None:
+    """Iterate the training loader for each worker count and print samples/s."""
+    cfg = parse_args(argv)
+    full_ds = UTKFace(cfg.data_dir)
+    label = "num_threads" if cfg.data_backend == "dali" else "num_workers"
+    for num_workers in cfg.workers:
+        train_loader = make_train_loader(cfg, full_ds, num_workers)
+        batches = iter(train_loader)
+        next(batches)  # warm-up: worker start-up is not steady-state throughput
+        n_samples = 0
+        start = time.perf_counter()
+        for _, (x, _) in zip(range(cfg.num_batches), batches):
+            n_samples += x.size(0)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label}={num_workers}: {n_samples / elapsed:.1f} samples/s "
+            f"({n_samples} young/old pairs in {elapsed:.1f}s)"
+        )
+        del batches, train_loader
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Pack UTKFace into a single memory-mapped uint8 array for decode-free training.
+
+Run once after placing the dataset under data/utkface_aligned_cropped/UTKFace;
+``UTKFace`` then reads the packed array instead of decoding JPEGs.
+"""
+
+import argparse
+import os
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+from tqdm import tqdm
+
+from aging_gan.data import PACKED_FILENAME, UTKFace
+
+
+def parse_args() -> argparse.Namespace:
+    """Parse command-line arguments for packing the dataset."""
+    p = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    p.add_argument(
+        "--data_dir",
+        type=str,
+        default=str(Path(__file__).resolve().parents[1] / "data"),
+        help="Directory containing utkface_aligned_cropped/UTKFace.",
+    )
+    return p.parse_args()
+
+
+def main() -> None:
+    """Decode and write every image into ``PACKED_FILENAME``."""
+    cfg = parse_args()
+    ds = UTKFace(cfg.data_dir, decode=False)  # only the sorted file list is needed
+    # keep the native resolution (200x200 for the aligned crops) so the train/eval
+    # transforms still resample each image exactly once, as they do for JPEGs
+    w, h = Image.open(ds.files[0]).size
+    out_path = ds.root.parent / PACKED_FILENAME
+    tmp_path = out_path.with_suffix(".tmp")
+
+    images = np.lib.format.open_memmap(
+        tmp_path, mode="w+", dtype=np.uint8, shape=(len(ds), h, w, 3)
+    )
+    for i, path in enumerate(tqdm(ds.files)):
+        img = Image.open(path).convert("RGB")
+        if img.size != (w, h):
+            img = img.resize((w, h), Image.BILINEAR)
+        images[i] = np.asarray(img)
+    images.flush()
+    del images
+    # rename at the end so a partial file is never picked up by UTKFace
+    os.replace(tmp_path, out_path)
+    print(f"Packed {len(ds)} images ({w}x{h}) -> {out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""NVIDIA DALI GPU input pipeline for the UTKFace dataset."""
+
+import logging
+from typing import Iterator
+
+from torch import Tensor
+
+from aging_gan.data import UTKFace, split_unpaired_indices
+
+try:
+    from nvidia.dali import fn, pipeline_def, types
+    from nvidia.dali.plugin.base_iterator import LastBatchPolicy
+    from nvidia.dali.plugin.pytorch import DALIGenericIterator
+except ImportError as e:
+    raise ImportError(
+        "The DALI data backend requires NVIDIA DALI. Install it with "
+        "`pip install nvidia-dali-cuda120 --extra-index-url https://pypi.nvidia.com`."
+    ) from e
+
+logger = logging.getLogger(__name__)
+
+
+def _load_and_augment(
+    files: list[str],
+    img_size: int,
+    train: bool,
+    name: str,
+    shard_id: int,
+    num_shards: int,
+):
+    """Read, decode (nvJPEG), augment and normalize one image stream on the GPU."""
+    jpegs, _ = fn.readers.file(
+        files=files,
+        random_shuffle=train,
+        shard_id=shard_id,
+        num_shards=num_shards,
+        name=name,
+    )
+    images = fn.decoders.image(jpegs, device="mixed", output_type=types.RGB)
+    if train:
+        # randomness: crop window and resize in a single resampling pass
+        images = fn.random_resized_crop(
+            images,
+            size=(img_size, img_size),
+            random_area=(0.75, 1.0),
+            random_aspect_ratio=(0.95, 1.05),
+            antialias=True,
+        )
+        # flip before rotating, like RandomHorizontalFlip + BatchTransform on
+        # the other backends (flipping afterwards would mirror the rotation)
+        images = fn.flip(images, horizontal=fn.random.coin_flip())
+        images = fn.rotate(
+            images,
+            angle=fn.random.uniform(range=(0.0, 80.0)),
+            keep_size=True,
+            fill_value=0,
+        )
+    else:
+        # deterministic
+        images = fn.resize(images, resize_shorter=img_size, antialias=True)
+    # crop, HWC -> CHW and normalization to [-1, 1] in a single kernel
+    return fn.crop_mirror_normalize(
+        images,
+        crop=(img_size, img_size),  # centered
+        mean=[127.5, 127.5, 127.5],
+        std=[127.5, 127.5, 127.5],
+        dtype=types.FLOAT,
+        output_layout="CHW",
+    )
+
+
+@pipeline_def
+def unpaired_pipeline(
+    young_files: list[str],
+    old_files: list[str],
+    img_size: int,
+    train: bool,
+    shard_id: int = 0,
+    num_shards: int = 1,
+):
+    """DALI pipeline yielding young/old image batches from two file readers.
+
+    Each process reads only its ``shard_id``-th of ``num_shards`` slices.
+    """
+    x = _load_and_augment(
+        young_files, img_size, train, "young_reader", shard_id, num_shards
+    )
+    y = _load_and_augment(
+        old_files, img_size, train, "old_reader", shard_id, num_shards
+    )
+    return x, y
+
+
+class DALIUnpairedLoader:
+    """Iterable yielding ``(young, old)`` CUDA batches like ``make_unpaired_loader``."""
+
+    def __init__(self, iterator: DALIGenericIterator):
+        self.iterator = iterator
+        self._in_epoch = False
+
+    def __len__(self) -> int:
+        """Return the number of batches per epoch."""
+        return len(self.iterator)
+
+    def __iter__(self) -> Iterator[tuple[Tensor, Tensor]]:
+        """Yield one epoch of normalized ``(B, 3, H, W)`` image batches."""
+        if self._in_epoch:
+            # finish an epoch abandoned mid-way (e.g. when sampling a few images)
+            # so the readers restart from a fresh shuffle
+            for _ in self.iterator:
+                pass
+        self._in_epoch = True
+        for batch in self.iterator:
+            yield batch[0]["x"], batch[0]["y"]
+        self._in_epoch = False
+
+
+def make_dali_unpaired_loader(
+    full_ds: UTKFace,
+    split: str,
+    batch_size: int = 4,
+    img_size: int = 256,
+    num_threads: int = 2,
+    seed: int = 42,
+    young_max: int = 28,  # 18-28
+    old_min: int = 40,  # 40+
+    shard_id: int = 0,
+    num_shards: int = 1,
+    device_id: int = 0,
+) -> DALIUnpairedLoader:
+    """Return a DALI loader yielding unpaired young/old image tuples on the GPU.
+
+    DALI shards the data itself (the loader is not wrapped by accelerate), so
+    distributed runs pass their process index/count and local GPU here.
+    """
+    part_y, part_o = split_unpaired_indices(full_ds, split, seed, young_max, old_min)
+    train = split == "train"
+
+    pipe = unpaired_pipeline(
+        young_files=[str(full_ds.files[i]) for i in part_y],
+        old_files=[str(full_ds.files[i]) for i in part_o],
+        img_size=img_size,
+        train=train,
+        shard_id=shard_id,
+        num_shards=num_shards,
+        batch_size=batch_size,
+        num_threads=num_threads,
+        device_id=device_id,
+        seed=seed + shard_id,  # different augmentations per process
+    )
+    pipe.build()
+    iterator = DALIGenericIterator(
+        pipe,
+        output_map=["x", "y"],
+        reader_name="young_reader",
+        last_batch_policy=(LastBatchPolicy.DROP if train else LastBatchPolicy.PARTIAL),
+        auto_reset=True,
+    )
+
+    logger.info(
+        f"- UTK {split} (DALI, shard {shard_id}/{num_shards}): "
+        f"young={len(part_y)}  old={len(part_o)}"
+    )
+    return DALIUnpairedLoader(iterator)
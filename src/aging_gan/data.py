@@ -1,34 +1,115 @@
 """Dataset and dataloader utilities for the UTKFace dataset."""
 
 import os
+import math
 import logging
-from dataclasses import dataclass
+from functools import partial
 from pathlib import Path
-from typing import Tuple
+from typing import Iterator, Tuple
 
+import PIL
+import numpy as np
 import torch
+import torch.nn as nn
+import torch.nn.functional as F
 from PIL import Image
 from torch import Tensor
-from torch.utils.data import DataLoader, Dataset, Subset
+from torch.utils.data import DataLoader, Dataset, Sampler
 import torchvision.transforms as T
+from accelerate import PartialState
+from torchvision.io import ImageReadMode, decode_jpeg, read_file
 
 logger = logging.getLogger(__name__)
 
+# Pillow-SIMD releases carry a ".postN" suffix; stock Pillow decodes and resizes
+# without the SIMD kernels and is noticeably slower on the CPU data path.
+if "post" not in PIL.__version__ and not os.environ.get("ALLOW_STOCK_PIL"):
+    logger.warning(
+        f"Using stock Pillow {PIL.__version__}; install pillow-simd for faster JPEG "
+        "decoding and resizing (set ALLOW_STOCK_PIL=1 to silence this warning)."
+    )
+
+
+# written by scripts/pack_utkface.py next to the image folder
+PACKED_FILENAME = "utkface_u8.npy"
+
 
 class UTKFace(Dataset):
-    """Lightweight UTKFace dataset reader."""
+    """Lightweight UTKFace dataset reader.
+
+    With ``decode=False`` items are the raw JPEG bytes as a ``uint8`` tensor,
+    left for ``jpeg_collate`` to decode a whole batch at once. If an up-to-date
+    packed array from ``scripts/pack_utkface.py`` exists, images are read as
+    ``uint8`` CHW tensors from that memory map instead of decoding JPEGs.
+    """
 
-    def __init__(self, root: str, transform: T.Compose | None = None):
+    def __init__(
+        self, root: str, transform: T.Compose | None = None, decode: bool = True
+    ):
         self.root = (
             Path(root) / "utkface_aligned_cropped" / "UTKFace"
         )  # or "UTKFace" for the unaligned and varied original version.
-        self.files = sorted(f for f in self.root.glob("*.jpg"))
-        if not self.files:
+        self.files, self.ages = self._load_index()
+        self.transform = transform
+        self.decode = decode
+        self.packed = self._find_packed() if decode else None
+        self._images = None  # memory map, opened lazily in each worker
+
+    def _find_packed(self) -> Path | None:
+        """Return the packed ``(N, H, W, 3)`` uint8 array if it matches the folder."""
+        packed = self.root.parent / PACKED_FILENAME
+        if not packed.exists():
+            return None
+        if packed.stat().st_mtime <= self.root.stat().st_mtime:
+            logger.warning(f"{packed} is older than {self.root}; decoding JPEGs.")
+            return None
+        n_packed = np.load(packed, mmap_mode="r").shape[0]
+        if n_packed != len(self.files):
+            logger.warning(
+                f"{packed} holds {n_packed} images but {self.root} has "
+                f"{len(self.files)}; decoding JPEGs."
+            )
+            return None
+        logger.info(f"Reading UTKFace images from {packed}")
+        return packed
+
+    def _load_index(self) -> tuple[list[Path], Tensor]:
+        """Return sorted file paths and ages, cached next to the image folder.
+
+        The cache is reused while it is newer than the folder (adding or
+        removing images bumps the folder mtime), so the directory is only
+        scanned once.
+        """
+        cache = self.root.parent / "utkface_index.pt"
+        if cache.exists() and cache.stat().st_mtime > self.root.stat().st_mtime:
+            names, ages = torch.load(cache, weights_only=True)
+            return [self.root / name for name in names], ages
+
+        files = sorted(f for f in self.root.glob("*.jpg"))
+        if not files:
             raise FileNotFoundError(
                 f"No UTKFace JPG files found in {self.root}/data/."
                 "Did you unzip the dataset into that folder?"
             )
-        self.transform = transform
+        # parse the age prefix of "<age>_<gender>_<race>_<date>.jpg" once
+        ages = torch.tensor(
+            [int(f.name.split("_")[0]) for f in files], dtype=torch.int16
+        )
+        # write to a per-process temp file and rename it, so other ranks or
+        # concurrent runs never load a half-written cache
+        tmp = cache.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            torch.save(([f.name for f in files], ages), tmp)
+            os.replace(tmp, cache)
+        except OSError as e:
+            logger.warning(f"Could not write UTKFace index cache {cache}: {e}")
+        return files, ages
+
+    def __getstate__(self) -> dict:
+        """Drop the open memory map when pickling (workers reopen it)."""
+        state = self.__dict__.copy()
+        state["_images"] = None
+        return state
 
     def __len__(self) -> int:
         """Return the number of images in the dataset."""
@@ -37,152 +118,396 @@ class UTKFace(Dataset):
     def __getitem__(self, idx: int) -> Tuple[Tensor, int]:
         """Return the transformed image and associated age label."""
         path = self.files[idx]
-        age = int(path.name.split("_")[0])
-        img = Image.open(path).convert("RGB")
+        age = int(self.ages[idx])
+        if not self.decode:
+            return read_file(str(path)), age
+        if self.packed is not None:
+            if self._images is None:
+                self._images = np.load(self.packed, mmap_mode="r")
+            # copy the HWC slice out of the read-only map, then view as CHW
+            img = torch.from_numpy(np.array(self._images[idx])).permute(2, 0, 1)
+        else:
+            img = Image.open(path).convert("RGB")
         if self.transform:
             img = self.transform(img)
         return img, age
 
 
-def make_unpaired_loader(
-    root: str,
+class BatchTransform(nn.Module):
+    """On-device tail of the input pipeline for whole ``uint8`` batches.
+
+    Converts ``(B, 3, H, W)`` uint8 images to float, optionally rotates each
+    image by its own random angle, and normalizes to [-1, 1]. Keeping this off
+    the dataloader workers ships 4x fewer bytes through the worker queues.
+    """
+
+    def __init__(self, degrees: tuple[float, float] | None = None):
+        super().__init__()
+        self.degrees = degrees
+
+    def rotate(self, x: Tensor) -> Tensor:
+        """Rotate each image counter-clockwise by a random angle in ``degrees``."""
+        angle = torch.empty(x.size(0), device=x.device).uniform_(*self.degrees)
+        angle = angle * (math.pi / 180)
+        cos, sin, zero = angle.cos(), angle.sin(), torch.zeros_like(angle)
+        theta = torch.stack(
+            [torch.stack([cos, -sin, zero], 1), torch.stack([sin, cos, zero], 1)], 1
+        )  # (B, 2, 3)
+        grid = F.affine_grid(theta, list(x.shape), align_corners=False)
+        # nearest + zero fill, same as T.RandomRotation's defaults
+        return F.grid_sample(x, grid, mode="nearest", align_corners=False)
+
+    def forward(self, x: Tensor) -> Tensor:
+        """Return the normalized float batch."""
+        x = T.functional.convert_image_dtype(x, torch.float32)  # [0, 255] -> [0, 1]
+        if self.degrees is not None:
+            x = self.rotate(x)
+        return T.functional.normalize(x, [0.5, 0.5, 0.5], [0.5, 0.5, 0.5])
+
+
+def make_batch_transforms(
+    backend: str = "pil",
+) -> tuple[BatchTransform | None, BatchTransform | None]:
+    """Return the (train, eval) on-device transforms for ``prepare_dataset`` batches."""
+    if backend == "dali":
+        # DALI already emits normalized float batches
+        return None, None
+    # randomness / deterministic
+    return BatchTransform(degrees=(0, 80)), BatchTransform()
+
+
+def _decode_batch(
+    bufs: tuple[Tensor, ...], transform: T.Compose | None, device: str
+) -> Tensor:
+    """Decode JPEG byte tensors in one call and stack the transformed images."""
+    imgs = decode_jpeg(list(bufs), mode=ImageReadMode.RGB, device=device)
+    if transform:
+        imgs = [transform(img) for img in imgs]
+    return torch.stack(imgs)
+
+
+def jpeg_collate(
+    batch: list[tuple[Tensor, Tensor]],
+    transform: T.Compose | None = None,
+    device: str = "cuda",
+) -> tuple[Tensor, Tensor]:
+    """Batch-decode raw young/old JPEG pairs (nvJPEG on CUDA) and apply ``transform``."""
+    young, old = zip(*batch)
+    return _decode_batch(young, transform, device), _decode_batch(
+        old, transform, device
+    )
+
+
+def split_unpaired_indices(
+    full_ds: UTKFace,
     split: str,
-    transform: T.Compose,
-    batch_size: int = 4,
-    num_workers: int = 1,
     seed: int = 42,
     young_max: int = 28,  # 18-28
     old_min: int = 40,  # 40+
-) -> DataLoader:
-    """Return a dataloader yielding unpaired young/old image tuples."""
-    full_ds = UTKFace(root, transform)
+    equal_length: bool = True,
+) -> tuple[list[int], list[int]]:
+    """Return young/old dataset indices for ``split``.
 
+    With ``equal_length`` the longer group is truncated to the shorter one.
+    """
     # Split into young, old indices
     rng = torch.Generator().manual_seed(seed)
-    young_idx = []
-    old_idx = []
-
-    for i, f in enumerate(full_ds.files):
-        age = int(f.name.split("_")[0])
-        if age <= young_max and age >= 18:
-            young_idx.append(i)
-        elif age >= old_min:
-            old_idx.append(i)
+    ages = full_ds.ages
+    is_young = (ages >= 18) & (ages <= young_max)
+    is_old = (ages >= old_min) & ~is_young
+    young_idx = is_young.nonzero(as_tuple=True)[0]  # int64 index tensors
+    old_idx = is_old.nonzero(as_tuple=True)[0]
 
-    if not young_idx or not old_idx:
+    if young_idx.numel() == 0 or old_idx.numel() == 0:
         raise ValueError(
             "Age thresholds left one split empty; adjust young_max/old_min"
         )
 
     # Deterministic shuffle and dataset split (80, 10, 10)
-    def split_indices(idxs: list[int]):
-        idxs = torch.tensor(
-            idxs
-        ).long()  # torch Subset() requires integer tensors, not floats. That is why we add .long()
-        idxs = idxs[torch.randperm(len(idxs), generator=rng)]
-        n = len(idxs)
+    def split_indices(idxs: Tensor) -> dict[str, Tensor]:
+        idxs = idxs[torch.randperm(idxs.numel(), generator=rng)]
+        n = idxs.numel()
         train = int(0.8 * n)
         valid = int(0.9 * n)
         return {"train": idxs[:train], "valid": idxs[train:valid], "test": idxs[valid:]}
 
-    part_y = split_indices(young_idx)[split].tolist()
-    part_o = split_indices(old_idx)[split].tolist()
+    part_y = split_indices(young_idx)[split]
+    part_o = split_indices(old_idx)[split]
 
-    # same dataset length
-    limit = min(len(part_y), len(part_o))
-    part_y = part_y[:limit]
-    part_o = part_o[:limit]
+    if equal_length:
+        # same dataset length
+        limit = min(part_y.numel(), part_o.numel())
+        part_y, part_o = part_y[:limit], part_o[:limit]
+    return part_y.tolist(), part_o.tolist()
 
-    # Wrap subsets in unpaird Dataset
-    @dataclass
-    class Unpaired(Dataset):
-        a: Dataset
-        b: Dataset
 
-        def __len__(self) -> int:
-            return max(len(self.a), len(self.b))
+class Unpaired(Dataset):
+    """Young/old image pairs read straight from a shared base dataset.
 
-        def __getitem__(self, idx: int):
-            x, _ = self.a[idx % len(self.a)]
-            y, _ = self.b[idx % len(self.b)]
-            return x, y
+    Items are indexed by ``(young_pos, old_pos)`` positions into ``idx_a`` and
+    ``idx_b``, as yielded by ``UnpairedSampler``.
+    """
 
-    young_ds = Subset(full_ds, part_y)
-    old_ds = Subset(full_ds, part_o)
-    paired = Unpaired(young_ds, old_ds)
+    def __init__(
+        self,
+        base: Dataset,
+        idx_a: list[int],
+        idx_b: list[int],
+        transform: T.Compose | None = None,
+    ):
+        self.base = base
+        self.idx_a = idx_a
+        self.idx_b = idx_b
+        self.transform = transform
+
+    def __len__(self) -> int:
+        """Return the number of pairs per epoch."""
+        return min(len(self.idx_a), len(self.idx_b))
 
-    logger.info(f"- UTK {split}: young={len(young_ds)}  old={len(old_ds)}")
+    def __getitem__(self, pair: tuple[int, int]) -> Tuple[Tensor, Tensor]:
+        """Return the transformed young and old images of ``pair``."""
+        a, b = pair
+        x, _ = self.base[self.idx_a[a]]
+        y, _ = self.base[self.idx_b[b]]
+        if self.transform:
+            x, y = self.transform(x), self.transform(y)
+        return x, y
+
+
+class UnpairedSampler(Sampler):
+    """Yield ``(young_pos, old_pos)`` pairs for ``Unpaired``.
+
+    With ``shuffle`` both groups are permuted afresh every epoch, so young and
+    old images are re-paired and the longer group is sampled uniformly rather
+    than truncated. Samplers run in the main process, so the new pairing also
+    reaches persistent workers. Without ``shuffle`` pair ``i`` is ``(i, i)``.
+    """
+
+    def __init__(
+        self,
+        n_a: int,
+        n_b: int,
+        shuffle: bool = False,
+        generator: torch.Generator | None = None,
+    ):
+        self.n_a = n_a
+        self.n_b = n_b
+        self.shuffle = shuffle
+        self.generator = generator
+
+    def __len__(self) -> int:
+        """Return the number of pairs per epoch."""
+        return min(self.n_a, self.n_b)
+
+    def __iter__(self) -> Iterator[tuple[int, int]]:
+        """Return this epoch's pairs."""
+        n = len(self)
+        if self.shuffle:
+            a = torch.randperm(self.n_a, generator=self.generator)[:n]
+            b = torch.randperm(self.n_b, generator=self.generator)[:n]
+        else:
+            a = b = torch.arange(n)
+        return zip(a.tolist(), b.tolist())
+
+
+def make_unpaired_loader(
+    full_ds: UTKFace,
+    split: str,
+    transform: T.Compose | None,
+    batch_size: int = 4,
+    num_workers: int = 1,
+    seed: int = 42,
+    young_max: int = 28,  # 18-28
+    old_min: int = 40,  # 40+
+    prefetch_factor: int = 2,
+) -> DataLoader:
+    """Return a dataloader yielding unpaired young/old image tuples.
+
+    ``full_ds`` is shared between splits and should not apply a transform
+    itself. If it yields raw JPEG bytes (``decode=False``) the images are
+    decoded and transformed per batch on the GPU in ``jpeg_collate``; CUDA
+    work cannot run in forked workers, so the loader then runs in the main
+    process.
+    """
+    gpu_decode = not full_ds.decode
+    if gpu_decode:
+        collate_fn = partial(jpeg_collate, transform=transform, device="cuda")
+        transform = None
+        num_workers = 0
+    else:
+        collate_fn = None
+    part_y, part_o = split_unpaired_indices(
+        full_ds, split, seed, young_max, old_min, equal_length=False
+    )
+
+    # Wrap both groups in an unpaired Dataset
+    paired = Unpaired(full_ds, part_y, part_o, transform)
+    sampler = UnpairedSampler(
+        len(part_y),
+        len(part_o),
+        shuffle=(split == "train"),
+        generator=torch.Generator().manual_seed(seed),
+    )
+
+    logger.info(
+        f"- UTK {split}: young={len(part_y)}  old={len(part_o)}  pairs={len(paired)}"
+    )
     return DataLoader(
         paired,
         batch_size=batch_size,
-        shuffle=(split == "train"),
+        sampler=sampler,
         drop_last=(split == "train"),
         num_workers=num_workers,
-        pin_memory=True,
-        persistent_workers=True,
-        prefetch_factor=4,
+        collate_fn=collate_fn,
+        pin_memory=not gpu_decode,  # batches are already on the GPU
+        persistent_workers=num_workers > 0,
+        prefetch_factor=prefetch_factor if num_workers > 0 else None,
     )
 
 
-def prepare_dataset(
-    train_batch_size: int = 4,
-    eval_batch_size: int = 8,
-    num_workers: int = 2,
-    img_size: int = 256,
-    seed: int = 42,
-) -> tuple[DataLoader, DataLoader, DataLoader]:
-    """Create train/validation/test dataloaders for UTKFace."""
-    data_dir = Path(__file__).resolve().parents[2] / "data"
-    os.makedirs(data_dir, exist_ok=True)
+def make_transforms(
+    img_size: int = 256, to_tensor: list | None = None
+) -> tuple[T.Compose, T.Compose]:
+    """Return the per-sample ``(train, eval)`` CPU transforms.
 
+    ``to_tensor`` is appended to both (e.g. ``[T.PILToTensor()]`` for PIL
+    inputs); leave it empty for inputs that are already uint8 tensors.
+    """
+    to_tensor = to_tensor or []
     # randomness
     train_transform = T.Compose(
         [
             # T.ToPILImage(),
             T.RandomHorizontalFlip(),
-            T.Resize((img_size + 50, img_size + 50), antialias=True),
-            T.RandomCrop(img_size),
-            T.RandomRotation(degrees=(0, 80)),
-            T.ToTensor(),
-            T.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5]),
+            # random crop window and resize in a single resampling pass
+            T.RandomResizedCrop(
+                img_size,
+                scale=(0.75, 1.0),
+                ratio=(0.95, 1.05),
+                interpolation=T.InterpolationMode.BILINEAR,  # fastest Pillow-SIMD path
+                antialias=True,
+            ),
+            *to_tensor,
         ]
     )
 
     # deterministic
     eval_transform = T.Compose(
         [
-            T.Resize((img_size + 50, img_size + 50), antialias=True),
+            T.Resize(
+                img_size,
+                interpolation=T.InterpolationMode.BILINEAR,
+                antialias=True,
+            ),
             T.CenterCrop(img_size),
-            T.ToTensor(),
-            T.Normalize([0.5, 0.5, 0.5], [0.5, 0.5, 0.5]),
+            *to_tensor,
         ]
     )
 
+    return train_transform, eval_transform
+
+
+def prepare_dataset(
+    train_batch_size: int = 4,
+    eval_batch_size: int = 8,
+    num_workers: int = 2,
+    img_size: int = 256,
+    seed: int = 42,
+    backend: str = "pil",
+    train_num_workers: int | None = None,
+    prefetch_factor: int = 2,
+) -> tuple[DataLoader, DataLoader, DataLoader]:
+    """Create train/validation/test dataloaders for UTKFace.
+
+    ``num_workers`` is used for the evaluation loaders and, unless
+    ``train_num_workers`` is given, for the training loader too. The DALI
+    backend uses them as its CPU thread counts (at least 1).
+
+    ``backend="pil"`` decodes and augments on CPU workers; ``backend="nvjpeg"``
+    batch-decodes with torchvision's nvJPEG and augments on the GPU;
+    ``backend="dali"`` runs the whole pipeline on the GPU with NVIDIA DALI.
+    The pil/nvjpeg loaders yield ``uint8`` batches that still need the
+    ``make_batch_transforms`` transforms once they are on the device.
+    """
+    data_dir = Path(__file__).resolve().parents[2] / "data"
+    os.makedirs(data_dir, exist_ok=True)
+    if train_num_workers is None:
+        train_num_workers = num_workers
+
+    if backend == "dali":
+        # imported lazily so DALI stays an optional dependency
+        from aging_gan.dali_pipeline import make_dali_unpaired_loader
+
+        logger.info("Initializing DALI dataset...")
+        full_ds = UTKFace(str(data_dir))
+        # DALI loaders bypass accelerate's sharding: read this process's shard
+        # on its own GPU (PartialState is shared with the later Accelerator)
+        state = PartialState()
+        shard = {
+            "shard_id": state.process_index,
+            "num_shards": state.num_processes,
+            "device_id": state.local_process_index,
+        }
+        # worker counts become DALI CPU thread counts, which must be >= 1
+        # (0 workers is valid for the DataLoader backends)
+        train_threads, eval_threads = max(1, train_num_workers), max(1, num_workers)
+        train_loader = make_dali_unpaired_loader(
+            full_ds,
+            "train",
+            train_batch_size,
+            img_size,
+            train_threads,
+            seed,
+            **shard,
+        )
+        val_loader = make_dali_unpaired_loader(
+            full_ds, "valid", eval_batch_size, img_size, eval_threads, seed, **shard
+        )
+        test_loader = make_dali_unpaired_loader(
+            full_ds, "test", eval_batch_size, img_size, eval_threads, seed, **shard
+        )
+        logger.info("Done.")
+        return train_loader, val_loader, test_loader
+    if backend not in ("pil", "nvjpeg"):
+        raise ValueError(f"backend must be 'pil', 'nvjpeg' or 'dali', got {backend}")
+    gpu_decode = backend == "nvjpeg"
+    # one shared base dataset: a single directory scan and file list
+    full_ds = UTKFace(str(data_dir), decode=not gpu_decode)
+    # PIL images -> uint8 CHW tensors; nvjpeg and the packed array already
+    # yield uint8 tensors. Float conversion, rotation and normalization run
+    # batched on the GPU (see make_batch_transforms).
+    to_tensor = [] if gpu_decode or full_ds.packed else [T.PILToTensor()]
+
+    train_transform, eval_transform = make_transforms(img_size, to_tensor)
+
     # loaders
     logger.info("Initializing dataset...")
     train_loader = make_unpaired_loader(
-        str(data_dir),
+        full_ds,
         "train",
         train_transform,
         train_batch_size,
-        num_workers,
+        train_num_workers,
         seed,
+        prefetch_factor=prefetch_factor,
     )
     val_loader = make_unpaired_loader(
-        str(data_dir),
+        full_ds,
         "valid",
         eval_transform,
         eval_batch_size,
         num_workers,
         seed,
+        prefetch_factor=prefetch_factor,
     )
     test_loader = make_unpaired_loader(
-        str(data_dir),
+        full_ds,
         "test",
         eval_transform,
         eval_batch_size,
         num_workers,
         seed,
+        prefetch_factor=prefetch_factor,
     )
     logger.info("Done.")
     return train_loader, val_loader, test_loader
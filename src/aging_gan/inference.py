@@ -6,11 +6,14 @@ import torch
 from pathlib import Path
 from PIL import Image
 from accelerate import Accelerator
-from torchmetrics.image.fid import FrechetInceptionDistance
 
 from aging_gan.model import initialize_models
-from aging_gan.utils import get_device
-from aging_gan.data import prepare_dataset
+from aging_gan.utils import (
+    get_device,
+    get_mixed_precision,
+    PairedFrechetInceptionDistance,
+)
+from aging_gan.data import prepare_dataset, make_batch_transforms
 from aging_gan.train import evaluate_epoch, initialize_loss_functions
 
 
@@ -102,7 +105,7 @@ def main() -> None:
         # image helpers
         preprocess = T.Compose(
             [
-                T.Resize((256 + 50, 256 + 50), antialias=True),
+                T.Resize(256, antialias=True),
                 T.CenterCrop(256),
                 T.ToTensor(),
                 T.Normalize((0.5, 0.5, 0.5), (0.5, 0.5, 0.5)),
@@ -151,6 +154,7 @@ def main() -> None:
     _, _, test_loader = prepare_dataset(
         cfg.eval_batch_size, cfg.eval_batch_size, cfg.num_workers, seed=cfg.seed
     )
+    _, eval_batch_transform = make_batch_transforms()
 
     # Load models and checkpoint
     G, F, DX, DY = initialize_models()
@@ -161,7 +165,7 @@ def main() -> None:
     DY.load_state_dict(ckpt["DY"])
 
     # Set up accelerator for mixed precision, parallelism, and moving to device
-    accelerator = Accelerator(mixed_precision="fp16")
+    accelerator = Accelerator(mixed_precision=get_mixed_precision())
     G, F, DX, DY, test_loader = accelerator.prepare(G, F, DX, DY, test_loader)
 
     # Initialize loss functions and FID metric
@@ -170,7 +174,7 @@ def main() -> None:
             cfg.lambda_adv_value, cfg.lambda_cyc_value, cfg.lambda_id_value
         )
     )
-    fid_metric = FrechetInceptionDistance(feature=2048, normalize=True).to(
+    fid_metric = PairedFrechetInceptionDistance(feature=2048, normalize=True).to(
         accelerator.device
     )
 
@@ -193,6 +197,7 @@ def main() -> None:
             lambda_id_value,
             fid_metric,
             accelerator,
+            eval_batch_transform,
         )
     print("Test-set metrics:")
     for name, value in metrics.items():
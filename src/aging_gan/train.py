@@ -1,4 +1,5 @@
 import argparse
+import functools
 import logging
 import torch
 import torch.nn as nn
@@ -7,9 +8,9 @@ import wandb
 import uuid
 import json
 from accelerate import Accelerator
+from torch import Tensor
 from torch.optim.lr_scheduler import LambdaLR
 from tqdm import tqdm
-from torchmetrics.image.fid import FrechetInceptionDistance
 from pathlib import Path
 
 
@@ -19,8 +20,10 @@ from aging_gan.utils import (
     save_checkpoint,
     generate_and_save_samples,
     get_device,
+    get_mixed_precision,
+    PairedFrechetInceptionDistance,
 )
-from aging_gan.data import prepare_dataset
+from aging_gan.data import prepare_dataset, make_batch_transforms
 from aging_gan.model import initialize_models
 from aging_gan.utils import terminate_ec2, archive_ec2
 
@@ -77,6 +80,12 @@ def parse_args() -> argparse.Namespace:
         default=0.5,
         help="Weight for identity loss",
     )
+    p.add_argument(
+        "--identity_decay_epochs",
+        type=int,
+        default=None,
+        help="Drop the identity loss (and its two generator passes per step) after this many epochs. Kept for the whole run by default.",
+    )
     p.add_argument(
         "--weight_decay",
         type=float,
@@ -108,7 +117,33 @@ def parse_args() -> argparse.Namespace:
         "--num_workers",
         type=int,
         default=3,
-        help="Number of workers for dataloaders.",
+        help="Number of workers for dataloaders (DALI thread count with --data_backend dali, min 1).",
+    )
+    p.add_argument(
+        "--num_workers_train",
+        type=int,
+        default=None,
+        help="Number of workers for the training dataloader (defaults to --num_workers; DALI thread count with --data_backend dali, min 1). Measure with scripts/bench_loader.py; more workers can be slower.",
+    )
+    p.add_argument(
+        "--prefetch_factor",
+        type=int,
+        default=2,
+        help="Batches prefetched per dataloader worker. Larger values rarely help and cost memory.",
+    )
+    p.add_argument(
+        "--data_backend",
+        type=str,
+        choices=["pil", "nvjpeg", "dali"],
+        default="pil",
+        help="Input pipeline: 'pil' decodes/augments on CPU workers, 'nvjpeg' batch-decodes and augments on the GPU, 'dali' runs the whole pipeline on the GPU with NVIDIA DALI.",
+    )
+    p.add_argument(
+        "--compile_mode",
+        type=str,
+        choices=["default", "reduce-overhead", "max-autotune"],
+        default=None,
+        help="torch.compile the models with this mode ('reduce-overhead' also captures CUDA Graphs). Disabled by default.",
     )
     p.add_argument(
         "--skip_test",
@@ -137,30 +172,39 @@ def parse_args() -> argparse.Namespace:
 def initialize_optimizers(
     cfg, G, F, DX, DY
 ) -> tuple[optim.Optimizer, optim.Optimizer, optim.Optimizer, optim.Optimizer]:
-    """Create Adam optimizers for all models."""
+    """Create Adam optimizers for all models.
+
+    Uses the fused (single-kernel) Adam implementation when the models already
+    live on a CUDA device.
+    """
+    fused = next(G.parameters()).is_cuda
     opt_G = optim.Adam(
         G.parameters(),
         lr=cfg.gen_lr,
         betas=(0.5, 0.999),
         weight_decay=cfg.weight_decay,
+        fused=fused,
     )
     opt_F = optim.Adam(
         F.parameters(),
         lr=cfg.gen_lr,
         betas=(0.5, 0.999),
         weight_decay=cfg.weight_decay,
+        fused=fused,
     )
     opt_DX = optim.Adam(
         DX.parameters(),
         lr=cfg.disc_lr,
         betas=(0.5, 0.999),
         weight_decay=cfg.weight_decay,
+        fused=fused,
     )
     opt_DY = optim.Adam(
         DY.parameters(),
         lr=cfg.disc_lr,
         betas=(0.5, 0.999),
         weight_decay=cfg.weight_decay,
+        fused=fused,
     )
 
     return opt_G, opt_F, opt_DX, opt_DY
@@ -181,6 +225,24 @@ def initialize_loss_functions(
     return mse, l1, lambda_adv, lambda_cyc, lambda_id
 
 
+@functools.cache
+def _constant(value: float, device: torch.device) -> Tensor:
+    """Return a cached one-element fp32 tensor holding ``value`` on ``device``."""
+    return torch.full((1,), value, device=device, dtype=torch.float32)
+
+
+def adversarial_target(logits: Tensor, real: bool) -> Tensor:
+    """Return the LSGAN ones/zeros target for ``logits`` without allocating.
+
+    The target is a cached one-element tensor expanded (stride 0) to the
+    logits' shape, instead of a fresh ``ones_like``/``zeros_like`` per call.
+    It is kept in fp32 because ``mse_loss`` autocasts to fp32: a target in
+    the fp16/bf16 logits' dtype would be cast (and materialized) every call.
+    """
+    value = 1.0 if real else 0.0
+    return _constant(value, logits.device).expand_as(logits)
+
+
 def make_schedulers(
     cfg, opt_G, opt_F, opt_DX, opt_DY
 ) -> tuple[LambdaLR, LambdaLR, LambdaLR, LambdaLR]:
@@ -203,6 +265,56 @@ def make_schedulers(
     return sched_G, sched_F, sched_DX, sched_DY
 
 
+class Prefetcher:
+    """Wrap a loader to copy the next batch to ``device`` while the current one computes.
+
+    On CUDA the host-to-device copy of batch N+1 is issued on a side stream
+    (apex-style) so it overlaps with the forward/backward pass of batch N.
+    """
+
+    def __init__(self, loader, device: torch.device):
+        self.loader = loader
+        self.device = device
+        self.stream = torch.cuda.Stream(device) if device.type == "cuda" else None
+
+    def __len__(self) -> int:
+        """Return the number of batches of the wrapped loader."""
+        return len(self.loader)
+
+    def __iter__(self):
+        """Start a new pass over the loader with the first batch in flight."""
+        self._loader_iter = iter(self.loader)
+        self._preload()
+        return self
+
+    def _preload(self) -> None:
+        """Fetch the next batch and start its (async on CUDA) copy to the device."""
+        try:
+            self.batch = next(self._loader_iter)
+        except StopIteration:
+            self.batch = None
+            return
+        if self.stream is None:
+            self.batch = tuple(t.to(self.device) for t in self.batch)
+            return
+        with torch.cuda.stream(self.stream):
+            self.batch = tuple(t.to(self.device, non_blocking=True) for t in self.batch)
+
+    def __next__(self):
+        """Return the prefetched batch once its copy is done, and prefetch the next."""
+        if self.stream is not None:
+            torch.cuda.current_stream(self.device).wait_stream(self.stream)
+        batch = self.batch
+        if batch is None:
+            raise StopIteration
+        if self.stream is not None:
+            # tensors were allocated on the side stream but are consumed on the compute stream
+            for t in batch:
+                t.record_stream(torch.cuda.current_stream(self.device))
+        self._preload()
+        return batch
+
+
 def perform_train_step(
     G,
     F,  # generator models
@@ -219,9 +331,23 @@ def perform_train_step(
     opt_DX,
     opt_DY,  # discriminator optimizers
     accelerator,
-) -> dict[str, float]:
-    """Run a single optimization step for generators and discriminators."""
+    batch_transform=None,
+) -> dict[str, Tensor]:
+    """Run a single optimization step for generators and discriminators.
+
+    Losses are returned as detached device tensors; calling ``.item()`` on
+    each would force a device sync every step.
+    """
+    # new iteration for CUDA Graphs captured by torch.compile (no-op otherwise)
+    torch.compiler.cudagraph_mark_step_begin()
     x, y = real_data
+    if batch_transform is not None:
+        # finish preprocessing uint8 batches on the device
+        x = batch_transform(x.to(accelerator.device, non_blocking=True))
+        y = batch_transform(y.to(accelerator.device, non_blocking=True))
+    # NHWC lets cuDNN pick Tensor Core kernels without internal transposes
+    x = x.contiguous(memory_format=torch.channels_last)
+    y = y.contiguous(memory_format=torch.channels_last)
     # ------ Update Generators ------
     opt_G.zero_grad(set_to_none=True)
     opt_F.zero_grad(set_to_none=True)
@@ -233,16 +359,19 @@ def perform_train_step(
         # Loss 1: adversarial terms
         fake_test_logits = DX(fake_x)  # fake x logits
         loss_f_adv = lambda_adv * mse(
-            fake_test_logits, torch.ones_like(fake_test_logits)
+            fake_test_logits, adversarial_target(fake_test_logits, real=True)
         )
         fake_test_logits = DY(fake_y)  # fake y logits
         loss_g_adv = lambda_adv * mse(
-            fake_test_logits, torch.ones_like(fake_test_logits)
+            fake_test_logits, adversarial_target(fake_test_logits, real=True)
         )
         # Loss 2: cycle terms
         loss_cyc = lambda_cyc * (l1(rec_x, x) + l1(rec_y, y))
-        # Loss 3: identity terms
-        loss_id = lambda_id * (l1(G(y), y) + l1(F(x), x))
+        # Loss 3: identity terms (skipping two generator passes when disabled)
+        if lambda_id > 0:
+            loss_id = lambda_id * (l1(G(y), y) + l1(F(x), x))
+        else:
+            loss_id = torch.zeros((), device=x.device)
         # Total loss
         loss_gen_total = loss_g_adv + loss_f_adv + loss_cyc + loss_id
     # Backprop + grad norm + step
@@ -254,44 +383,44 @@ def perform_train_step(
     opt_F.step()
 
     # ------ Update Discriminators ------
-    # DX: real young vs fake young
+    # DX and DY have disjoint parameters, so one backward over the summed loss
+    # yields the same gradients as two separate passes
     opt_DX.zero_grad(set_to_none=True)
+    opt_DY.zero_grad(set_to_none=True)
     with accelerator.autocast():
+        # DX: real young vs fake young
         real_logits = DX(x)
-        real_loss = mse(real_logits, torch.ones_like(real_logits))
+        real_loss = mse(real_logits, adversarial_target(real_logits, real=True))
         fake_logits = DX(fake_x.detach())
-        fake_loss = mse(fake_logits, torch.zeros_like(fake_logits))
+        fake_loss = mse(fake_logits, adversarial_target(fake_logits, real=False))
         # DX loss
         loss_DX = 0.5 * (real_loss + fake_loss)
-    # backprop + grad norm + step
-    accelerator.backward(loss_DX)
-    accelerator.clip_grad_norm_(DX.parameters(), max_norm=1.0)
-    opt_DX.step()
 
-    # DY: real old vs fake old
-    opt_DY.zero_grad(set_to_none=True)
-    with accelerator.autocast():
+        # DY: real old vs fake old
         real_logits = DY(y)
-        real_loss = mse(real_logits, torch.ones_like(real_logits))
+        real_loss = mse(real_logits, adversarial_target(real_logits, real=True))
         fake_logits = DY(fake_y.detach())
-        fake_loss = mse(fake_logits, torch.zeros_like(fake_logits))
+        fake_loss = mse(fake_logits, adversarial_target(fake_logits, real=False))
         # DY loss
         loss_DY = 0.5 * (
             real_loss + fake_loss
         )  # average loss to prevent discriminator learning "too quickly" compread to generators.
     # backprop + grad norm + step
-    accelerator.backward(loss_DY)
-    accelerator.clip_grad_norm_(DY.parameters(), max_norm=1.0)
+    accelerator.backward(loss_DX + loss_DY)
+    accelerator.clip_grad_norm_(
+        list(DX.parameters()) + list(DY.parameters()), max_norm=1.0
+    )
+    opt_DX.step()
     opt_DY.step()
 
     return {
-        "train/loss_DX": loss_DX.item(),
-        "train/loss_DY": loss_DY.item(),
-        "train/loss_f_adv": loss_f_adv.item(),
-        "train/loss_g_adv": loss_g_adv.item(),
-        "train/loss_cyc": loss_cyc.item(),
-        "train/loss_id": loss_id.item(),
-        "train/loss_gen_total": loss_gen_total.item(),
+        "train/loss_DX": loss_DX.detach(),
+        "train/loss_DY": loss_DY.detach(),
+        "train/loss_f_adv": loss_f_adv.detach(),
+        "train/loss_g_adv": loss_g_adv.detach(),
+        "train/loss_cyc": loss_cyc.detach(),
+        "train/loss_id": loss_id.detach(),
+        "train/loss_gen_total": loss_gen_total.detach(),
     }
 
 
@@ -309,6 +438,7 @@ def evaluate_epoch(
     lambda_id,  # loss functions and loss params
     fid_metric,
     accelerator,
+    batch_transform=None,
 ) -> dict[str, float]:
     """Evaluate models on ``loader`` and return averaged metrics."""
     metrics = {
@@ -326,6 +456,13 @@ def evaluate_epoch(
     with torch.no_grad(), accelerator.autocast():
         fid_metric.reset()
         for x, y in tqdm(loader):
+            torch.compiler.cudagraph_mark_step_begin()
+            if batch_transform is not None:
+                # finish preprocessing uint8 batches on the device
+                x = batch_transform(x.to(accelerator.device, non_blocking=True))
+                y = batch_transform(y.to(accelerator.device, non_blocking=True))
+            x = x.contiguous(memory_format=torch.channels_last)
+            y = y.contiguous(memory_format=torch.channels_last)
             # Forward: Generate fakes and reconstrucitons
             fake_x = F(y)
             fake_y = G(x)
@@ -335,36 +472,39 @@ def evaluate_epoch(
             # Loss 1: adversarial terms
             fake_test_logits = DX(fake_x)  # fake x logits
             loss_f_adv = lambda_adv * mse(
-                fake_test_logits, torch.ones_like(fake_test_logits)
+                fake_test_logits, adversarial_target(fake_test_logits, real=True)
             )
 
             fake_test_logits = DY(fake_y)  # fake y logits
             loss_g_adv = lambda_adv * mse(
-                fake_test_logits, torch.ones_like(fake_test_logits)
+                fake_test_logits, adversarial_target(fake_test_logits, real=True)
             )
             # Loss 2: cycle terms
             loss_cyc = lambda_cyc * (l1(rec_x, x) + l1(rec_y, y))
-            # Loss 3: identity terms
-            loss_id = lambda_id * (l1(G(y), y) + l1(F(x), x))
+            # Loss 3: identity terms (skipping two generator passes when disabled)
+            if lambda_id > 0:
+                loss_id = lambda_id * (l1(G(y), y) + l1(F(x), x))
+            else:
+                loss_id = torch.zeros((), device=x.device)
             # Total loss
             loss_gen_total = loss_g_adv + loss_f_adv + loss_cyc + loss_id
 
             # ------ Evaluate Discriminators ------
             # DX: real young vs fake young
             real_logits = DX(x)
-            real_loss = mse(real_logits, torch.ones_like(real_logits))
+            real_loss = mse(real_logits, adversarial_target(real_logits, real=True))
 
             fake_logits = DX(fake_x)
-            fake_loss = mse(fake_logits, torch.zeros_like(fake_logits))
+            fake_loss = mse(fake_logits, adversarial_target(fake_logits, real=False))
             # DX loss
             loss_DX = 0.5 * (real_loss + fake_loss)
 
             # DY: real old vs fake old
             real_logits = DY(y)
-            real_loss = mse(real_logits, torch.ones_like(real_logits))
+            real_loss = mse(real_logits, adversarial_target(real_logits, real=True))
 
             fake_logits = DY(fake_y)
-            fake_loss = mse(fake_logits, torch.zeros_like(fake_logits))
+            fake_loss = mse(fake_logits, adversarial_target(fake_logits, real=False))
 
             # DY loss
             loss_DY = 0.5 * (
@@ -373,29 +513,36 @@ def evaluate_epoch(
 
             # FID metric (normalize to range of [0,1] from [-1,1])
             # FID expects float32 images, which can raise dtype warning for mixed precision batches unless converted.
-            fid_metric.update((y * 0.5 + 0.5).float(), real=True)
-            fid_metric.update((fake_y * 0.5 + 0.5).float(), real=False)
-
-            # ------ Accumulate ------
-            metrics[f"{split}/loss_DX"] += loss_DX.item()
-            metrics[f"{split}/loss_DY"] += loss_DY.item()
-            metrics[f"{split}/loss_f_adv"] += loss_f_adv.item()
-            metrics[f"{split}/loss_g_adv"] += loss_g_adv.item()
-            metrics[f"{split}/loss_cyc"] += loss_cyc.item()
-            metrics[f"{split}/loss_id"] += loss_id.item()
-            metrics[f"{split}/loss_gen_total"] += loss_gen_total.item()
+            # Real and fake images share one Inception forward pass.
+            # torch.cat returns a fresh (promoted) buffer, so it is safe to rescale in place:
+            # one allocation instead of a mul/add/cast temporary per tensor.
+            imgs = torch.cat([y, fake_y]).float().mul_(0.5).add_(0.5)
+            fid_metric.update_paired(imgs, num_real=y.size(0))
+
+            # ------ Accumulate (on the device, without syncing) ------
+            metrics[f"{split}/loss_DX"] += loss_DX
+            metrics[f"{split}/loss_DY"] += loss_DY
+            metrics[f"{split}/loss_f_adv"] += loss_f_adv
+            metrics[f"{split}/loss_g_adv"] += loss_g_adv
+            metrics[f"{split}/loss_cyc"] += loss_cyc
+            metrics[f"{split}/loss_id"] += loss_id
+            metrics[f"{split}/loss_gen_total"] += loss_gen_total
 
             n_batches += 1
 
         # Compute epoch fid metric
-        fid_val = fid_metric.compute()
-        metrics[f"{split}/fid_val"] = fid_val.item()
-
+        metrics[f"{split}/fid_val"] = fid_metric.compute()
+
+    # pull all sums to the host in a single sync
+    keys = list(metrics)
+    values = torch.stack(
+        [
+            torch.as_tensor(metrics[k], dtype=torch.float64, device=accelerator.device)
+            for k in keys
+        ]
+    ).tolist()
     # per-batch average
-    for k in metrics:
-        metrics[k] /= n_batches
-
-    return metrics
+    return {k: v / n_batches for k, v in zip(keys, values)}
 
 
 def perform_epoch(
@@ -422,6 +569,8 @@ def perform_epoch(
     epoch,
     accelerator,
     fid_metric,
+    train_batch_transform=None,
+    eval_batch_transform=None,
 ) -> dict[str, float]:
     """Perform a single epoch."""
     # TRAINING
@@ -431,7 +580,9 @@ def perform_epoch(
     DX.train()
     DY.train()
     batches_per_epoch = len(train_loader)
-    for batch_no, real_data in enumerate(tqdm(train_loader)):
+    for batch_no, real_data in enumerate(
+        tqdm(Prefetcher(train_loader, accelerator.device))
+    ):
         train_metrics = perform_train_step(
             G,
             F,  # generator models
@@ -448,9 +599,13 @@ def perform_epoch(
             opt_DX,
             opt_DY,  # discriminator optimizers
             accelerator,
+            train_batch_transform,
         )
         # Print statistics and generate iamge after every n-th batch
         if batch_no % cfg.steps_for_logging_metrics == 0:
+            # one device sync for all losses, only on logging steps
+            values = torch.stack([v.float() for v in train_metrics.values()]).tolist()
+            train_metrics = dict(zip(train_metrics, values))
             epoch_float = epoch + (batch_no + 1) / batches_per_epoch
             logger.info(
                 f"train/loss_DX: {train_metrics['train/loss_DX']:.4f} | train/loss_DY: {train_metrics['train/loss_DY']:.4f} | train/loss_gen_total: {train_metrics['train/loss_gen_total']:.4f} | train/loss_g_adv: {train_metrics['train/loss_g_adv']:.4f} | train/loss_f_adv: {train_metrics['train/loss_f_adv']:.4f} | train/loss_cyc: {train_metrics['train/loss_cyc']:.4f} | train/loss_id: {train_metrics['train/loss_id']:.4f}"
@@ -488,6 +643,7 @@ def perform_epoch(
         lambda_id,  # loss functions and loss params
         fid_metric,  # evaluation metric
         accelerator,
+        eval_batch_transform,
     )
     logger.info(
         f"val/loss_DX: {val_metrics['val/loss_DX']:.4f} | val/loss_DY: {val_metrics['val/loss_DY']:.4f} | val/fid_val: {val_metrics['val/fid_val']:.4f} | val/loss_gen_total: {val_metrics['val/loss_gen_total']:.4f} | val/loss_g_adv: {val_metrics['val/loss_g_adv']:.4f} | val/loss_f_adv: {val_metrics['val/loss_f_adv']:.4f} | val/loss_cyc: {val_metrics['val/loss_cyc']:.4f} | val/loss_id: {val_metrics['val/loss_id']:.4f}"
@@ -500,6 +656,7 @@ def perform_epoch(
         epoch,
         get_device(),
         cfg.num_sample_generations_to_save,
+        eval_batch_transform,
     )
     # Clear memory after every epoch
     torch.cuda.empty_cache()
@@ -539,6 +696,10 @@ def main() -> None:
         logger.info("Skipping setting seed...")
     # speedups (Enable cuDNN auto-tuner which is good for fixed input shapes)
     torch.backends.cudnn.benchmark = True
+    # TF32 tensor cores (Ampere+) for the fp32 matmuls/convs outside autocast, e.g. FID's Inception
+    torch.set_float32_matmul_precision("high")
+    torch.backends.cuda.matmul.allow_tf32 = True
+    torch.backends.cudnn.allow_tf32 = True
 
     # ---------- Data Preprocessing ----------
     train_loader, val_loader, test_loader = prepare_dataset(
@@ -546,11 +707,24 @@ def main() -> None:
         cfg.eval_batch_size,
         cfg.num_workers,
         seed=cfg.seed,
+        backend=cfg.data_backend,
+        train_num_workers=cfg.num_workers_train,
+        prefetch_factor=cfg.prefetch_factor,
+    )
+    train_batch_transform, eval_batch_transform = make_batch_transforms(
+        cfg.data_backend
     )
 
     # ---------- Models, Optimizers, Loss Functions, Schedulers Initialization ----------
     # Initialize the generators (G, F) and discriminators (DX, DY)
     G, F, DX, DY = initialize_models()
+    # Prepare Accelerator (uses hf accelerate to move models to correct device,
+    # wrap in DDP if needed, shard the dataloader, and enable mixed-precision).
+    accelerator = Accelerator(mixed_precision=get_mixed_precision())
+    # place models on their device before building the (fused) optimizers, in
+    # channels_last (NHWC) memory format for faster convs under AMP
+    for m in (G, F, DX, DY):
+        m.to(accelerator.device, memory_format=torch.channels_last)
     # Initialize optimizers
     (
         opt_G,
@@ -558,9 +732,6 @@ def main() -> None:
         opt_DX,
         opt_DY,
     ) = initialize_optimizers(cfg, G, F, DX, DY)
-    # Prepare Accelerator (uses hf accelerate to move models to correct device,
-    # wrap in DDP if needed, shard the dataloader, and enable mixed-precision).
-    accelerator = Accelerator(mixed_precision="fp16")
     (
         G,
         F,
@@ -570,7 +741,6 @@ def main() -> None:
         opt_F,
         opt_DX,
         opt_DY,
-        train_loader,
         val_loader,
         test_loader,
     ) = accelerator.prepare(
@@ -582,10 +752,16 @@ def main() -> None:
         opt_F,
         opt_DX,
         opt_DY,
-        train_loader,
         val_loader,
         test_loader,
     )
+    # the training batches are moved to the device by Prefetcher on a side stream
+    train_loader = accelerator.prepare(train_loader, device_placement=[False])
+    # compile in place so state_dict keys (and checkpoints) stay unchanged
+    if cfg.compile_mode is not None:
+        logger.info(f"Compiling models with mode={cfg.compile_mode}...")
+        for m in (G, F, DX, DY):
+            m.compile(mode=cfg.compile_mode)
     # Loss functions and scalers
     mse, l1, lambda_adv, lambda_cyc, lambda_id = initialize_loss_functions(
         cfg.lambda_adv_value, cfg.lambda_cyc_value, cfg.lambda_id_value
@@ -595,7 +771,7 @@ def main() -> None:
         cfg, opt_G, opt_F, opt_DX, opt_DY
     )
     # Initialize FID metric for evaluation
-    fid_metric = FrechetInceptionDistance(feature=2048, normalize=True).to(
+    fid_metric = PairedFrechetInceptionDistance(feature=2048, normalize=True).to(
         accelerator.device
     )
 
@@ -603,6 +779,11 @@ def main() -> None:
     best_fid = float("inf")  # keep track of the best FID score for each epoch
     for epoch in range(1, cfg.num_train_epochs + 1):
         logger.info(f"\nEPOCH {epoch}")
+        # identity loss mostly matters while the generators warm up
+        if cfg.identity_decay_epochs is not None and epoch > cfg.identity_decay_epochs:
+            epoch_lambda_id = 0.0
+        else:
+            epoch_lambda_id = lambda_id
         val_metrics = perform_epoch(
             cfg,
             train_loader,
@@ -615,7 +796,7 @@ def main() -> None:
             l1,
             lambda_adv,
             lambda_cyc,
-            lambda_id,
+            epoch_lambda_id,
             opt_G,
             opt_F,  # generator optimizers
             opt_DX,
@@ -627,6 +808,8 @@ def main() -> None:
             epoch,
             accelerator,
             fid_metric,
+            train_batch_transform,
+            eval_batch_transform,
         )
         # save the best models with the lowest fid score
         if val_metrics["val/fid_val"] < best_fid:
@@ -708,6 +891,7 @@ def main() -> None:
             lambda_id,  # loss functions and loss params
             fid_metric,  # evaluation metric
             accelerator,
+            eval_batch_transform,
         )
         logger.info(f"Test metrics (best.pth):\n{test_metrics}")
         wandb.log(test_metrics)
@@ -12,6 +12,8 @@ import boto3
 import time
 from dotenv import load_dotenv
 from pathlib import Path
+from torch import Tensor
+from torchmetrics.image.fid import FrechetInceptionDistance
 
 load_dotenv()
 
@@ -23,6 +25,19 @@ def get_device() -> torch.device:
     return torch.device("cuda" if torch.cuda.is_available() else "cpu")
 
 
+def get_mixed_precision() -> str:
+    """Return "bf16" on GPUs that support it (Ampere+), else "fp16".
+
+    bf16 has fp32-like range, so it needs no dynamic loss scaling. Pre-Ampere
+    GPUs (T4, V100) only emulate bf16 without Tensor Cores, so they keep fp16.
+    """
+    if torch.cuda.is_available() and torch.cuda.is_bf16_supported(
+        including_emulation=False
+    ):
+        return "bf16"
+    return "fp16"
+
+
 def set_seed(seed: int) -> None:
     """Seed all RNGs (Python, NumPy, Torch) for deterministic runs."""
     random.seed(seed)  # vanilla Python Random Number Generator (RNG)
@@ -33,6 +48,43 @@ def set_seed(seed: int) -> None:
     torch.backends.cudnn.benchmark = False  # trade speed for reproducibility
 
 
+class PairedFrechetInceptionDistance(FrechetInceptionDistance):
+    """FID that extracts real and fake features in a single Inception forward.
+
+    ``update_paired(imgs, num_real)`` takes a stacked batch whose first
+    ``num_real`` rows are real and the rest fake, and accumulates both feature
+    sets from one pass instead of two. Splitting by a count (rather than a
+    boolean mask) avoids a device sync per batch.
+    """
+
+    def update_paired(self, imgs: Tensor, num_real: int) -> None:
+        """Update the real and fake feature statistics from one stacked batch."""
+        # run with the same bookkeeping torchmetrics wraps around ``update``
+        # (no grad, cached result reset, update count)
+        self._wrap_update(self._update_paired)(imgs, num_real)
+
+    def _update_paired(self, imgs: Tensor, num_real: int) -> None:
+        """Accumulate real/fake features split at row ``num_real``."""
+        imgs = (
+            (imgs * 255).byte()
+            if self.normalize and (not self.used_custom_model)
+            else imgs
+        )
+        features = self.inception(imgs)
+        self.orig_dtype = features.dtype
+        features = features.double()
+        if features.dim() == 1:
+            features = features.unsqueeze(0)
+
+        real_features, fake_features = features[:num_real], features[num_real:]
+        self.real_features_sum += real_features.sum(dim=0)
+        self.real_features_cov_sum += real_features.t().mm(real_features)
+        self.real_features_num_samples += real_features.shape[0]
+        self.fake_features_sum += fake_features.sum(dim=0)
+        self.fake_features_cov_sum += fake_features.t().mm(fake_features)
+        self.fake_features_num_samples += fake_features.shape[0]
+
+
 def load_environ_vars(wandb_project: str = "aging-gan") -> None:
     """Set basic environment variables needed for a run."""
     os.environ["WANDB_PROJECT"] = wandb_project
@@ -93,8 +145,12 @@ def generate_and_save_samples(
     epoch,
     device: torch.device,
     num_samples: int = 8,
+    transform=None,
 ) -> None:
-    """Generate ``num_samples`` images from ``generator`` and save a grid."""
+    """Generate ``num_samples`` images from ``generator`` and save a grid.
+
+    ``transform`` finishes preprocessing raw loader batches on ``device``.
+    """
     # grab batches until num_samples
     collected = []
     for imgs, _ in val_loader:
@@ -106,6 +162,8 @@ def generate_and_save_samples(
         raise ValueError("Validation loader is empty.")
 
     inputs = torch.cat(collected, dim=0)[:num_samples].to(device)
+    if transform is not None:
+        inputs = transform(inputs)
 
     with torch.no_grad():
         outputs = generator(inputs)
@@ -0,0 +1,46 @@
+import importlib.util
+from pathlib import Path
+
+import pytest
+from test_data import create_utk_dataset
+
+SCRIPT = Path(__file__).resolve().parents[1] / "scripts" / "bench_loader.py"
+spec = importlib.util.spec_from_file_location("bench_loader", SCRIPT)
+bench_loader = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(bench_loader)
+
+
+def test_bench_loader_pil(tmp_path, capsys):
+    """The pil sweep times one training loader per worker count."""
+    root = create_utk_dataset(tmp_path)
+    bench_loader.main(
+        [
+            "--data_dir",
+            str(root),
+            "--workers",
+            "0",
+            "1",
+            "--num_batches",
+            "1",
+            "--train_batch_size",
+            "1",
+            "--img_size",
+            "16",
+        ]
+    )
+    lines = capsys.readouterr().out.splitlines()
+    assert [line.split(":")[0] for line in lines] == ["num_workers=0", "num_workers=1"]
+
+
+@pytest.mark.parametrize(
+    "argv",
+    [
+        ["--data_backend", "nvjpeg"],
+        ["--data_backend", "dali", "--workers", "0", "2"],
+        ["--workers", "-1"],
+    ],
+)
+def test_bench_loader_rejects_invalid_sweeps(argv):
+    """Sweeps that would not measure anything are rejected up front."""
+    with pytest.raises(SystemExit):
+        bench_loader.parse_args(argv)
@@ -1,3 +1,6 @@
+import os
+import numpy as np
+import torch
 from pathlib import Path
 from PIL import Image
 import torchvision.transforms as T
@@ -29,13 +32,24 @@ def test_utkface_len_and_getitem(tmp_path):
     img, age = ds[0]
     assert isinstance(age, int)
     assert isinstance(img, Image.Image)
+    assert ds.ages.tolist() == [int(f.name.split("_")[0]) for f in ds.files]
+
+
+def test_utkface_raw_bytes_and_jpeg_collate(tmp_path):
+    """Undecoded items are JPEG bytes that jpeg_collate batch-decodes."""
+    root = create_utk_dataset(tmp_path)
+    ds = data.UTKFace(str(root), decode=False)
+    buf, _ = ds[0]
+    assert buf.dtype == torch.uint8 and buf.dim() == 1
+    x, y = data.jpeg_collate([(buf, buf), (buf, buf)], device="cpu")
+    assert x.shape == y.shape == (2, 3, 32, 32)
 
 
 def test_make_unpaired_loader(tmp_path):
     """Loader returns equal-sized batches of young and old images."""
     root = create_utk_dataset(tmp_path)
     loader = data.make_unpaired_loader(
-        str(root),
+        data.UTKFace(str(root)),
         "train",
         T.Compose([T.ToTensor()]),
         batch_size=2,
@@ -47,3 +61,72 @@ def test_make_unpaired_loader(tmp_path):
     x, y = next(iter(loader))
     assert x.shape == y.shape
     assert x.shape[0] == 2
+
+
+def test_unpaired_sampler_pairs():
+    """Eval pairs are fixed; train pairs stay in range and re-pair each epoch."""
+    fixed = data.UnpairedSampler(3, 5)
+    assert list(fixed) == [(0, 0), (1, 1), (2, 2)]
+    shuffled = data.UnpairedSampler(
+        30, 50, shuffle=True, generator=torch.Generator().manual_seed(0)
+    )
+    first, second = list(shuffled), list(shuffled)
+    assert len(first) == len(shuffled) == 30
+    assert all(a < 30 and b < 50 for a, b in first)
+    assert first != second
+
+
+def test_batch_transform_normalizes_uint8():
+    """Batch transform maps uint8 images to [-1, 1] floats of the same shape."""
+    x = torch.randint(0, 256, (2, 3, 16, 16), dtype=torch.uint8)
+    out = data.BatchTransform()(x)
+    assert out.dtype == torch.float32 and out.shape == x.shape
+    assert out.min() >= -1.0 and out.max() <= 1.0
+    # a zero-degree rotation leaves the batch untouched
+    assert torch.equal(data.BatchTransform(degrees=(0, 0))(x), out)
+
+
+def test_utkface_index_cache(tmp_path, monkeypatch):
+    """A second UTKFace reuses the cached file index instead of re-globbing."""
+    root = create_utk_dataset(tmp_path)
+    first = data.UTKFace(str(root))
+    cache = root / "utkface_aligned_cropped" / "utkface_index.pt"
+    assert cache.exists()
+    assert not list(cache.parent.glob("*.tmp"))
+
+    def no_glob(self, pattern):
+        raise AssertionError("directory was re-scanned")
+
+    with monkeypatch.context() as m:
+        m.setattr(Path, "glob", no_glob)
+        second = data.UTKFace(str(root))
+    assert second.files == first.files
+    assert torch.equal(second.ages, first.ages)
+
+
+def test_utkface_index_cache_stale(tmp_path):
+    """A cache older than the image folder is rebuilt from a fresh scan."""
+    root = create_utk_dataset(tmp_path)
+    first = data.UTKFace(str(root))
+    cache = root / "utkface_aligned_cropped" / "utkface_index.pt"
+    ds_root = root / "utkface_aligned_cropped" / "UTKFace"
+    Image.new("RGB", (32, 32)).save(ds_root / "50_0_0_202001010200.jpg")
+    # make sure the folder is strictly newer even on coarse-mtime filesystems
+    mtime = cache.stat().st_mtime + 10
+    os.utime(ds_root, (mtime, mtime))
+    second = data.UTKFace(str(root))
+    assert len(second) == len(first) + 1
+    assert 50 in second.ages.tolist()
+
+
+def test_utkface_reads_packed_array(tmp_path):
+    """A packed uint8 array replaces JPEG decoding with memory-mapped reads."""
+    root = create_utk_dataset(tmp_path)
+    n = len(data.UTKFace(str(root)))
+    packed = np.full((n, 8, 8, 3), 7, dtype=np.uint8)
+    np.save(root / "utkface_aligned_cropped" / data.PACKED_FILENAME, packed)
+    ds = data.UTKFace(str(root))
+    assert ds.packed is not None
+    img, _ = ds[0]
+    assert img.dtype == torch.uint8 and img.shape == (3, 8, 8)
+    assert int(img[0, 0, 0]) == 7
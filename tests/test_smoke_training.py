@@ -34,6 +34,10 @@ class DummyFID:
         """Update dummy FID with new data (no-op)."""
         pass
 
+    def update_paired(self, *args, **kwargs):
+        """Update dummy FID with a stacked real/fake batch (no-op)."""
+        pass
+
     def compute(self):
         """Return a zero tensor as the dummy FID score."""
         return torch.tensor(0.0)
@@ -43,8 +47,9 @@ def test_smoke_training(tmp_path, monkeypatch):
     """Run a tiny end-to-end training epoch to verify nothing breaks."""
     root = create_utk_dataset(tmp_path)
     transform = T.Compose([T.ToTensor()])
+    full_ds = data.UTKFace(str(root))
     train_loader = data.make_unpaired_loader(
-        str(root),
+        full_ds,
         "train",
         transform,
         batch_size=2,
@@ -54,7 +59,7 @@ def test_smoke_training(tmp_path, monkeypatch):
         old_min=40,
     )
     val_loader = data.make_unpaired_loader(
-        str(root),
+        full_ds,
         "valid",
         transform,
         batch_size=2,
@@ -104,3 +109,37 @@ def test_smoke_training(tmp_path, monkeypatch):
         fid,
     )
     assert "val/loss_gen_total" in metrics
+
+
+def test_train_step_without_identity_loss():
+    """A zero identity weight skips the identity passes and reports zero loss."""
+    G, F, DX, DY = model.initialize_models(ngf=4, ndf=4, n_blocks=1)
+    opt_cfg = SimpleNamespace(gen_lr=1e-3, disc_lr=1e-3, weight_decay=0.0)
+    opts = train.initialize_optimizers(opt_cfg, G, F, DX, DY)
+    mse, l1, adv, cyc, _ = train.initialize_loss_functions()
+    real_data = (torch.randn(2, 3, 32, 32), torch.randn(2, 3, 32, 32))
+    metrics = train.perform_train_step(
+        G, F, DX, DY, real_data, mse, l1, adv, cyc, 0.0, *opts, DummyAccelerator()
+    )
+    assert float(metrics["train/loss_id"]) == 0.0
+
+
+def test_train_step_with_grad_scaler():
+    """A step with fp16 loss scaling unscales each optimizer at most once."""
+    from accelerate import Accelerator
+
+    accelerator = Accelerator(cpu=True, mixed_precision="fp16")
+    # emulate an fp16 CUDA run: accelerate only creates a GradScaler on GPU
+    accelerator.native_amp = True
+    accelerator.scaler = torch.amp.GradScaler("cpu")
+    G, F, DX, DY = model.initialize_models(ngf=4, ndf=4, n_blocks=1)
+    opt_cfg = SimpleNamespace(gen_lr=1e-3, disc_lr=1e-3, weight_decay=0.0)
+    opts = train.initialize_optimizers(opt_cfg, G, F, DX, DY)
+    G, F, DX, DY, *opts = accelerator.prepare(G, F, DX, DY, *opts)
+    mse, l1, adv, cyc, ident = train.initialize_loss_functions()
+    real_data = (torch.randn(2, 3, 32, 32), torch.randn(2, 3, 32, 32))
+    for _ in range(2):
+        metrics = train.perform_train_step(
+            G, F, DX, DY, real_data, mse, l1, adv, cyc, ident, *opts, accelerator
+        )
+    assert torch.isfinite(metrics["train/loss_DX"])
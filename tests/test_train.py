@@ -34,3 +34,26 @@ def test_make_schedulers_decay():
     assert opts[0].param_groups[0]["lr"] == 1.0
     sched_G.step(3)
     assert opts[0].param_groups[0]["lr"] < 1.0
+
+
+def test_prefetcher_yields_all_batches():
+    """Prefetcher yields every loader batch on the target device."""
+    loader = [(torch.zeros(2, 3), torch.ones(2, 3)) for _ in range(3)]
+    prefetcher = train.Prefetcher(loader, torch.device("cpu"))
+    batches = list(prefetcher)
+    assert len(prefetcher) == len(batches) == 3
+    assert all(x.device.type == "cpu" and y.sum() == 6 for x, y in batches)
+
+
+def test_adversarial_target_is_cached_expand():
+    """Adversarial targets match ones/zeros_like without new storage."""
+    logits = torch.randn(4, 1)
+    ones = train.adversarial_target(logits, real=True)
+    zeros = train.adversarial_target(logits, real=False)
+    assert torch.equal(ones, torch.ones_like(logits))
+    assert torch.equal(zeros, torch.zeros_like(logits))
+    assert ones.stride()[0] == 0
+    assert train.adversarial_target(logits, real=True).data_ptr() == ones.data_ptr()
+    # low-precision logits share the fp32 target that mse_loss autocasts to
+    half = train.adversarial_target(logits.bfloat16(), real=True)
+    assert half.dtype == torch.float32 and half.data_ptr() == ones.data_ptr()
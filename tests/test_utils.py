@@ -23,6 +23,22 @@ def test_get_device_cpu():
     assert utils.get_device().type == "cpu"
 
 
+def test_get_mixed_precision_cpu():
+    """Mixed precision falls back to fp16 when CUDA is unavailable."""
+    assert utils.get_mixed_precision() == "fp16"
+
+
+def test_get_mixed_precision_ignores_emulated_bf16(monkeypatch):
+    """GPUs that only emulate bf16 (pre-Ampere) stay on fp16."""
+    monkeypatch.setattr(torch.cuda, "is_available", lambda: True)
+    monkeypatch.setattr(
+        torch.cuda,
+        "is_bf16_supported",
+        lambda including_emulation=True: including_emulation,
+    )
+    assert utils.get_mixed_precision() == "fp16"
+
+
 def test_save_checkpoint(tmp_path):
     """Checkpoint file is created on disk."""
     model = torch.nn.Linear(1, 1)
@@ -50,3 +66,28 @@ def test_save_checkpoint(tmp_path):
     )
     assert ckpt_file.exists()
     ckpt_file.unlink()
+
+
+class TinyExtractor(torch.nn.Module):
+    def __init__(self):
+        """Initialize a small linear feature extractor for FID tests."""
+        super().__init__()
+        self.fc = torch.nn.Linear(3 * 8 * 8, 4)
+
+    def forward(self, x):
+        """Return 4 features per image."""
+        return self.fc(torch.nn.functional.adaptive_avg_pool2d(x.float(), 8).flatten(1))
+
+
+def test_paired_fid_matches_separate_updates():
+    """A single stacked update accumulates the same stats as two updates."""
+    extractor = TinyExtractor()
+    paired = utils.PairedFrechetInceptionDistance(feature=extractor)
+    separate = utils.PairedFrechetInceptionDistance(feature=extractor)
+    real_imgs, fake_imgs = torch.rand(5, 3, 8, 8), torch.rand(5, 3, 8, 8)
+
+    paired.update_paired(torch.cat([real_imgs, fake_imgs]), num_real=5)
+    separate.update(real_imgs, real=True)
+    separate.update(fake_imgs, real=False)
+    assert paired._update_count == 1
+    assert torch.allclose(paired.compute(), separate.compute())